@@ -1,14 +1,78 @@
-import json
+import atexit
 import os
 import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+import orjson
 from src.session_analyzer import SessionAnalyzer
 from src.snowflake_client import SnowflakeClient
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging; records are handed to a background listener thread so
+# worker threads never block on log I/O or contend on the stream lock.
+# force=True replaces the StreamHandler that the src imports above already
+# installed via their own basicConfig calls, which would otherwise make
+# this call a no-op
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)], force=True)
 logger = logging.getLogger(__name__)
 
+# Number of tokens processed concurrently; the work is dominated by
+# blocking Snowflake and LLM round-trips, so threads are enough.
+MAX_WORKERS = 16
+
+# Each worker thread gets its own SessionAnalyzer (and thus its own
+# Snowflake connection), since the clients are not thread-safe.
+_thread_local = threading.local()
+_analyzers = []
+_analyzers_lock = threading.Lock()
+
+
+def _get_analyzer() -> SessionAnalyzer:
+    analyzer = getattr(_thread_local, 'analyzer', None)
+    if analyzer is None:
+        analyzer = SessionAnalyzer()
+        _thread_local.analyzer = analyzer
+        with _analyzers_lock:
+            _analyzers.append(analyzer)
+    return analyzer
+
+
+def process_token(token_id, project_id, start_date, end_date, intents_file, errors_file, write_lock, prefetched=None):
+    """Analyze one token and write its intents/errors. Returns (intent_count, error_count)."""
+    logger.info("\nProcessing token: %s", token_id)
+    analyzer = _get_analyzer()
+    try:
+        intent_count = 0
+        error_count = 0
+        # Stream results to disk as the analyzer produces them instead of
+        # materializing full per-token lists. orjson serializes the
+        # dataclasses (and their datetimes/enums) natively; the lock keeps
+        # lines from different workers from interleaving.
+        for kind, item in analyzer.iter_results(token_id, project_id, start_date, end_date, prefetched):
+            line = orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+            if kind == 'intent':
+                with write_lock:
+                    intents_file.write(line)
+                intent_count += 1
+            else:
+                with write_lock:
+                    errors_file.write(line)
+                error_count += 1
+
+        logger.info("Found %d intents and %d errors", intent_count, error_count)
+        return intent_count, error_count
+
+    except Exception as e:
+        logger.info("Error processing token %s in project %s: %s", token_id, project_id, str(e))
+        return 0, 0
+
+
 def main():
     # Initial test case
     # token_id = "155991_kbc-eu-central-1"
@@ -19,84 +83,57 @@ def main():
 
     # Initialize clients
     snowflake_client = SnowflakeClient()
-    analyzer = SessionAnalyzer()
 
     try:
-        # Get all matching project IDs
-        project_ids = snowflake_client.get_distinct_project_ids(project_id_filter)
-        logger.info(f"Found {len(project_ids)} projects matching filter '{project_id_filter}'")
+        # Get all matching project IDs and their tokens in a single pass
+        project_token_map = snowflake_client.get_project_token_map(project_id_filter)
+        logger.info(f"Found {len(project_token_map)} projects matching filter '{project_id_filter}'")
 
         # Create output directory and open files for writing
         os.makedirs('output', exist_ok=True)
-        
+
         total_intents = 0
         total_errors = 0
+        write_lock = threading.Lock()
 
-        with open('output/intents.jsonl', 'w', buffering=1) as intents_file, \
-             open('output/errors.jsonl', 'w', buffering=1) as errors_file:
+        with open('output/intents.jsonl', 'wb', buffering=1 << 20) as intents_file, \
+             open('output/errors.jsonl', 'wb', buffering=1 << 20) as errors_file, \
+             ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
 
             # Process each project
-            for project_id in project_ids:
+            for project_id, token_ids in project_token_map.items():
                 logger.info(f"\nProcessing project: {project_id}")
-                
-                # Get all token IDs for this project
-                token_ids = snowflake_client.get_distinct_token_ids(project_id)
                 logger.info(f"Found {len(token_ids)} tokens in project {project_id}")
 
-                # Process each token
-                for token_id in token_ids:
-                    logger.info(f"\nProcessing token: {token_id}")
-                    try:
-                        intents, errors = analyzer.analyze_user_sessions(token_id, project_id, start_date, end_date)
-                        
-                        # Write intents to file immediately
-                        for intent in intents:
-                            intent_data = {
-                                'start_time': intent.start_time.isoformat(),
-                                'end_time': intent.end_time.isoformat(),
-                                'token_id': intent.token_id,
-                                'project_id': intent.project_id,
-                                'configuration_ids': intent.configuration_ids,
-                                'intent_description': intent.intent_description,
-                                'is_successful': intent.is_successful,
-                                'session_id': intent.session_id,
-                                'fulfillment': intent.fulfillment,
-                                'tags': intent.tags,
-                                'classification': intent.classification,
-                                'development_stage': intent.development_stage,
-                                'summary': intent.summary
-                            }
-                            intents_file.write(json.dumps(intent_data) + '\n')
-                        intents_file.flush()  # Force Python buffer flush
-                        logger.info(f"DEBUG: Wrote {len(intents)} intents to file")
-                        
-                        # Write errors to file immediately
-                        for error in errors:
-                            error_data = {
-                                'start_time': error.start_time.isoformat(),
-                                'end_time': error.end_time.isoformat(),
-                                'token_id': error.token_id,
-                                'project_id': error.project_id,
-                                'configuration_ids': error.configuration_ids,
-                                'error_category': error.error_category.value,
-                                'context': error.context
-                            }
-                            errors_file.write(json.dumps(error_data) + '\n')
-                        errors_file.flush()  # Force Python buffer flush
-                        logger.info(f"DEBUG: Wrote {len(errors)} errors to file")
-                        
-                        total_intents += len(intents)
-                        total_errors += len(errors)
-                        logger.info(f"Found {len(intents)} intents and {len(errors)} errors")
-                        
-                    except Exception as e:
-                        logger.info(f"Error processing token {token_id} in project {project_id}: {str(e)}")
+                # Fetch the whole project window in one round-trip and hand
+                # each worker its token's pre-partitioned event streams,
+                # instead of querying Snowflake once per token
+                token_events = snowflake_client.get_project_token_events(project_id, start_date, end_date)
+
+                # Process tokens in parallel; they are independent of each other
+                results = executor.map(
+                    lambda token_id: process_token(
+                        token_id, project_id, start_date, end_date,
+                        intents_file, errors_file, write_lock,
+                        token_events.get(token_id, ([], [], [], []))
+                    ),
+                    token_ids
+                )
+                for intent_count, error_count in results:
+                    total_intents += intent_count
+                    total_errors += error_count
+
+                # Flush once per project instead of once per record; block
+                # buffering handles the rest
+                intents_file.flush()
+                errors_file.flush()
 
         logger.info(f"\nAnalysis complete. Found {total_intents} total intents and {total_errors} total errors.")
 
     finally:
         snowflake_client.close()
-        analyzer.close()
+        for analyzer in _analyzers:
+            analyzer.close()
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
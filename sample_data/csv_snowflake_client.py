@@ -1,23 +1,63 @@
-import csv
 import os
 import logging
 from datetime import datetime
 from typing import List, Dict, Any
+import pandas as pd
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Event types excluded server-side by SnowflakeClient.get_table_events
+_EXCLUDED_TABLE_EVENTS = frozenset({'storage.tableMetadataSet', 'storage.workspaceTableCloned'})
+
 class CSVSnowflakeClient:
     """
     A modified SnowflakeClient that reads from CSV files instead of querying Snowflake.
     Used for testing the intent analysis script with sample data.
+
+    Each CSV file is parsed at most once per client instance, including its
+    timestamp column (converted to int64 nanoseconds up front); individual
+    queries only run in-memory filters over the cached columns.
     """
-    
+
     def __init__(self, data_dir: str = "sample_data"):
         self.data_dir = data_dir
+        # Parsed CSV tables cached by filename; each file is read from disk
+        # at most once per client regardless of how many (project, token)
+        # pairs are queried.
+        self._tables: Dict[str, pd.DataFrame] = {}
+        # Timestamp columns converted to int64 nanoseconds, parsed once per
+        # (file, column) so date filtering is a plain integer comparison.
+        self._date_ns: Dict[tuple, pd.Series] = {}
         logger.info("Initialized CSV-based Snowflake client")
 
+    def _load_table(self, filename: str) -> pd.DataFrame:
+        """Load a CSV file, caching the parsed table across calls"""
+        df = self._tables.get(filename)
+        if df is None:
+            file_path = os.path.join(self.data_dir, filename)
+            # Keep all values as strings so rows look exactly like DictReader
+            # rows; memory_map avoids copying the file through Python IO.
+            # Some sample files contain rows with mis-escaped quotes inside
+            # JSON columns; DictReader used to parse those into shifted rows
+            # that never survived the token/project filters, so skipping them
+            # outright preserves the observable behavior
+            df = pd.read_csv(file_path, dtype=str, keep_default_na=False,
+                             engine='c', memory_map=True, on_bad_lines='skip')
+            self._tables[filename] = df
+        return df
+
+    def _date_ns_column(self, filename: str, date_column: str) -> pd.Series:
+        """Get a timestamp column as int64 nanoseconds, parsing it only once"""
+        key = (filename, date_column)
+        col = self._date_ns.get(key)
+        if col is None:
+            df = self._load_table(filename)
+            col = pd.to_datetime(df[date_column], utc=True, format='ISO8601').astype('int64')
+            self._date_ns[key] = col
+        return col
+
     def get_configuration_versions(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
         return self._read_csv_file(
             "kbc_component_configuration_version.csv",
@@ -40,57 +80,113 @@ class CSVSnowflakeClient:
         )
 
     def get_table_events(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        return self._read_csv_file(
+        events = self._read_csv_file(
             "kbc_table_event.csv",
             token_id, project_id, start_date, end_date,
             date_column="event_created_at"
         )
+        return [event for event in events if event['event'] not in _EXCLUDED_TABLE_EVENTS]
+
+    def get_window_events(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> tuple:
+        """
+        Fetch all four event streams for one (token, project, window).
+        Mirrors SnowflakeClient.get_window_events; with cached in-memory
+        tables there is no round-trip to amortize, so this simply chains
+        the four getters.
+        """
+        return (
+            self.get_configuration_versions(token_id, project_id, start_date, end_date),
+            self.get_configuration_row_versions(token_id, project_id, start_date, end_date),
+            self.get_jobs(token_id, project_id, start_date, end_date),
+            self.get_table_events(token_id, project_id, start_date, end_date),
+        )
+
+    def get_project_token_events(self, project_id: str, start_date: datetime, end_date: datetime) -> Dict[str, tuple]:
+        """
+        Mirror of SnowflakeClient.get_project_token_events over the cached
+        tables: filter each file for the whole project window once and
+        partition the rows per token.
+        """
+        specs = (
+            ("kbc_component_configuration_version.csv", "configuration_updated_at"),
+            ("kbc_component_configuration_row_version.csv", "configuration_row_updated_at"),
+            ("kbc_job.csv", "job_created_at"),
+            ("kbc_table_event.csv", "event_created_at"),
+        )
+        per_token: Dict[str, tuple] = {}
+        for index, (filename, date_column) in enumerate(specs):
+            df = self._load_table(filename)
+            dates_ns = self._date_ns_column(filename, date_column)
+            mask = (
+                (df['kbc_project_id'] == project_id)
+                & (dates_ns >= self._as_utc(start_date).value)
+                & (dates_ns <= self._as_utc(end_date).value)
+            )
+            order = dates_ns[mask].sort_values(kind='stable').index
+            rows = df.loc[order].to_dict('records')
+            if filename == "kbc_table_event.csv":
+                rows = [row for row in rows if row['event'] not in _EXCLUDED_TABLE_EVENTS]
+            for row in rows:
+                per_token.setdefault(row['kbc_token_id'], ([], [], [], []))[index].append(row)
+        return per_token
+
+    def _matching_project_ids(self, project_id_filter: str) -> pd.Series:
+        """
+        Unique project IDs matching the filter. The substring search runs
+        once per distinct project ID; row-level filtering is then a cheap
+        hash lookup via isin() instead of a per-row substring scan.
+        """
+        df = self._load_table("kbc_component_configuration_version.csv")
+        unique_ids = df['kbc_project_id'].drop_duplicates()
+        return unique_ids[unique_ids.str.contains(project_id_filter, regex=False)]
 
     def get_distinct_project_ids(self, project_id_filter: str) -> List[str]:
         """Get distinct project IDs that match the filter"""
-        file_path = os.path.join(self.data_dir, "kbc_component_configuration_version.csv")
-        project_ids = set()
-        
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if project_id_filter in row['kbc_project_id']:
-                    project_ids.add(row['kbc_project_id'])
-        
-        return sorted(list(project_ids))
+        return sorted(self._matching_project_ids(project_id_filter))
 
     def get_distinct_token_ids(self, project_id_filter: str) -> List[str]:
         """Get distinct token IDs for projects matching the filter"""
-        file_path = os.path.join(self.data_dir, "kbc_component_configuration_version.csv")
-        token_ids = set()
-        
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                if project_id_filter in row['kbc_project_id']:
-                    token_ids.add(row['kbc_token_id'])
-        
-        return sorted(list(token_ids))
-
-    def _read_csv_file(self, filename: str, token_id: str, project_id: str, 
+        df = self._load_table("kbc_component_configuration_version.csv")
+        matching = self._matching_project_ids(project_id_filter)
+        token_ids = df['kbc_token_id'][df['kbc_project_id'].isin(matching)].unique()
+        return sorted(token_ids)
+
+    def get_project_token_map(self, project_id_filter: str) -> Dict[str, List[str]]:
+        """Get all matching project IDs and their token IDs in a single pass"""
+        df = self._load_table("kbc_component_configuration_version.csv")
+        matching = df[df['kbc_project_id'].isin(self._matching_project_ids(project_id_filter))]
+        return {
+            project_id: sorted(tokens.unique())
+            for project_id, tokens in matching.groupby('kbc_project_id')['kbc_token_id']
+        }
+
+    def _read_csv_file(self, filename: str, token_id: str, project_id: str,
                       start_date: datetime, end_date: datetime, date_column: str) -> List[Dict[str, Any]]:
-        """Read and filter data from a CSV file"""
-        file_path = os.path.join(self.data_dir, filename)
-        results = []
-        
-        with open(file_path, 'r', newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # Filter by token_id and project_id
-                if (row['kbc_token_id'] == token_id and 
-                    row['kbc_project_id'] == project_id):
-                    
-                    # Filter by date range
-                    row_date = datetime.fromisoformat(row[date_column].replace('Z', '+00:00'))
-                    if start_date <= row_date <= end_date:
-                        results.append(row)
-        
-        return results
+        """Filter the cached table for one (token, project, window) query"""
+        df = self._load_table(filename)
+
+        dates_ns = self._date_ns_column(filename, date_column)
+        mask = (
+            (df['kbc_token_id'] == token_id)
+            & (df['kbc_project_id'] == project_id)
+            & (dates_ns >= self._as_utc(start_date).value)
+            & (dates_ns <= self._as_utc(end_date).value)
+        )
+        # Rows stay plain dicts: SessionAnalyzer keys into them by column
+        # name (the SnowflakeClient DictCursor contract) and immediately
+        # converts them to its own typed dataclasses in src/models.py, so
+        # only the filtered subset is ever materialized as dicts. The rows
+        # are returned ordered by the timestamp column, matching the
+        # ORDER BY in the SnowflakeClient queries (the analyzer merges the
+        # streams assuming each one arrives sorted).
+        order = dates_ns[mask].sort_values(kind='stable').index
+        return df.loc[order].to_dict('records')
+
+    @staticmethod
+    def _as_utc(dt: datetime) -> pd.Timestamp:
+        """Convert a (possibly naive) datetime to a UTC timestamp for comparison"""
+        ts = pd.Timestamp(dt)
+        return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
 
     def close(self):
         """No connection to close for CSV client"""
@@ -99,4 +195,4 @@ class CSVSnowflakeClient:
 
 # Usage example:
 # Replace the regular SnowflakeClient import in main.py with:
-# from sample_data.csv_snowflake_client import CSVSnowflakeClient as SnowflakeClient 
\ No newline at end of file
+# from sample_data.csv_snowflake_client import CSVSnowflakeClient as SnowflakeClient
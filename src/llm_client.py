@@ -1,6 +1,8 @@
 import os
-import json
-from typing import List, Dict, Any
+import hashlib
+from dataclasses import asdict
+from typing import List, Dict, Any, Optional
+import orjson
 import google.generativeai as genai
 from dotenv import load_dotenv
 from .models import Session
@@ -8,70 +10,94 @@ from .models import Session
 load_dotenv()
 
 class LLMClient:
+    # Number of sessions packed into a single batched analysis prompt
+    BATCH_SIZE = 8
+
+    # On-disk cache of LLM responses keyed by session-data hash, so
+    # re-runs over the same data skip the model calls entirely
+    CACHE_DIR = os.path.join('output', '.llm_cache')
+
+    # Rough per-prompt budget for the embedded session JSON; at ~4
+    # characters per token this keeps requests well inside the model
+    # context without pulling in a tokenizer dependency
+    MAX_SESSION_JSON_CHARS = 100_000
+
     def __init__(self):
         genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
         # Use gemini-1.0-pro as the default model
         model_name = os.getenv('MODEL', 'gemini-1.0-pro')
         self.model = genai.GenerativeModel(model_name)
+        os.makedirs(self.CACHE_DIR, exist_ok=True)
+        # In-memory layer over the disk cache for get_completion; many
+        # sessions in a project are near-duplicates and produce identical
+        # classification prompts
+        self._completion_cache: Dict[str, str] = {}
+
+    @staticmethod
+    def _cache_key(session_data: Dict[str, Any]) -> str:
+        # session_id is a fresh uuid every run; leave it out of the hash so
+        # identical sessions map to the same disk-cache entry across re-runs
+        hashed = {k: v for k, v in session_data.items() if k != 'session_id'}
+        payload = orjson.dumps(hashed, option=orjson.OPT_SORT_KEYS)
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        path = os.path.join(self.CACHE_DIR, key)
+        try:
+            with open(path, 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _cache_put(self, key: str, text: str):
+        path = os.path.join(self.CACHE_DIR, key)
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def _build_session_data(self, session: Session, processed_changes: Dict[str, List[str]], config_summary: Dict[str, List[str]]) -> Dict[str, Any]:
+        # Prepare the session data for the LLM; asdict recurses into the
+        # nested change/job/event dataclasses without per-field copying
+        session_data = asdict(session)
+        session_data["processed_changes"] = processed_changes
+        session_data["config_summary"] = config_summary
+        return session_data
+
+    @classmethod
+    def _session_json(cls, session_data: Dict[str, Any], budget: Optional[int] = None) -> str:
+        """
+        Serialize session data for prompt embedding under a hard size
+        budget (MAX_SESSION_JSON_CHARS unless the caller passes a smaller
+        share of it). Oversized payloads first lose the raw configuration
+        states (already summarized in processed_changes/config_summary),
+        then get cut at the budget as a last resort.
+        """
+        if budget is None:
+            budget = cls.MAX_SESSION_JSON_CHARS
+        payload = orjson.dumps(session_data).decode()
+        if len(payload) <= budget:
+            return payload
+
+        slim = dict(session_data)
+        for field in ('configuration_changes', 'configuration_row_changes'):
+            slim[field] = [
+                {k: v for k, v in change.items() if k not in ('initial_state', 'final_state')}
+                for change in slim.get(field, [])
+            ]
+        payload = orjson.dumps(slim).decode()
+        return payload[:budget]
 
     def analyze_session(self, session: Session, processed_changes: Dict[str, List[str]], config_summary: Dict[str, List[str]]) -> str:
-        # Prepare the session data for the LLM
-        session_data = {
-            "start_time": session.start_time.isoformat(),
-            "end_time": session.end_time.isoformat(),
-            "token_id": session.token_id,
-            "project_id": session.project_id,
-            "is_successful": session.is_successful,
-            "configuration_changes": [
-                {
-                    "configuration_id": change.configuration_id,
-                    "is_created": change.is_created,
-                    "is_deleted": change.is_deleted,
-                    "initial_state": change.initial_state,
-                    "final_state": change.final_state
-                }
-                for change in session.configuration_changes
-            ],
-            "configuration_row_changes": [
-                {
-                    "configuration_row_id": change.configuration_row_id,
-                    "configuration_id": change.configuration_id,
-                    "is_created": change.is_created,
-                    "is_deleted": change.is_deleted,
-                    "initial_state": change.initial_state,
-                    "final_state": change.final_state
-                }
-                for change in session.configuration_row_changes
-            ],
-            "job_executions": [
-                {
-                    "job_id": job.job_id,
-                    "configuration_id": job.configuration_id,
-                    "start_time": job.start_time.isoformat(),
-                    "end_time": job.end_time.isoformat(),
-                    "status": job.status,
-                    "error_message": job.error_message
-                }
-                for job in session.job_executions
-            ],
-            "table_events": [
-                {
-                    "event_id": event.event_id,
-                    "event_type": event.event_type,
-                    "event_time": event.event_time.isoformat(),
-                    "table_id": event.table_id,
-                    "message": event.message
-                }
-                for event in session.table_events
-            ],
-            "processed_changes": processed_changes,
-            "config_summary": config_summary
-        }
+        session_data = self._build_session_data(session, processed_changes, config_summary)
+
+        cache_key = self._cache_key(session_data)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
 
         # Create the prompt for the LLM
         prompt = f"""
-        Analyze the following user session data and provide a comprehensive, detailed description of the user's intent and its fulfillment. 
-        
+        Analyze the following user session data and provide a comprehensive, detailed description of the user's intent and its fulfillment.
+
         Focus on:
         1. **Multi-step processes**: Describe the full journey including initial attempts, failures, debugging steps, and iterative refinements
         2. **Nuanced success assessment**: Distinguish between partial success, complete success, and specific failure points
@@ -79,7 +105,7 @@ class LLMClient:
         4. **Iterative workflows**: Recognize trial-and-error processes, configuration adjustments, and troubleshooting patterns
 
         Session Data:
-        {json.dumps(session_data, indent=2)}
+        {self._session_json(session_data)}
 
         Provide a comprehensive intent description that captures:
         - What the user was trying to achieve (be specific about data sources, destinations, transformations)
@@ -98,11 +124,117 @@ class LLMClient:
 
         # Get the response from the LLM
         response = self.model.generate_content(prompt)
-        return response.text.strip()
+        result = response.text.strip()
+        self._cache_put(cache_key, result)
+        return result
+
+    def analyze_sessions_batch(self, items: List[tuple]) -> List[Any]:
+        """
+        Analyze multiple sessions, packing up to BATCH_SIZE sessions into a
+        single prompt to amortize the per-call round-trip latency. Sessions
+        whose response is already cached on disk skip the model entirely.
+
+        items is a list of (session, processed_changes, config_summary)
+        tuples; returns one entry per item, in order: the intent
+        description, or the exception that prevented it. A failed model
+        call never affects the other sessions in the batch.
+        """
+        descriptions: List[Any] = [None] * len(items)
+        payloads = []
+        keys = []
+        pending = []
+        for idx, (session, processed_changes, config_summary) in enumerate(items):
+            session_data = self._build_session_data(session, processed_changes, config_summary)
+            key = self._cache_key(session_data)
+            payloads.append(session_data)
+            keys.append(key)
+            cached = self._cache_get(key)
+            if cached is not None:
+                descriptions[idx] = cached
+            else:
+                pending.append(idx)
+
+        for start in range(0, len(pending), self.BATCH_SIZE):
+            chunk = pending[start:start + self.BATCH_SIZE]
+            if len(chunk) == 1:
+                self._analyze_single(items, descriptions, chunk[0])
+                continue
+
+            parsed = self._analyze_chunk([payloads[idx] for idx in chunk])
+            if parsed is not None:
+                for idx, description in zip(chunk, parsed):
+                    self._cache_put(keys[idx], description)
+                    descriptions[idx] = description
+            else:
+                # Fall back to one call per session if the batched response
+                # could not be parsed
+                for idx in chunk:
+                    self._analyze_single(items, descriptions, idx)
+        return descriptions
+
+    def _analyze_single(self, items: List[tuple], descriptions: List[Any], idx: int):
+        """Analyze one session in place, recording a failure as the exception"""
+        session, processed_changes, config_summary = items[idx]
+        try:
+            descriptions[idx] = self.analyze_session(session, processed_changes, config_summary)
+        except Exception as e:
+            descriptions[idx] = e
+
+    def _analyze_chunk(self, payloads: List[Dict[str, Any]]) -> Optional[List[str]]:
+        # Split the size budget evenly across the chunk so the assembled
+        # prompt stays within the same cap as a single-session prompt
+        budget = self.MAX_SESSION_JSON_CHARS // len(payloads)
+        sessions_block = "\n\n".join(
+            f"Session {i + 1}:\n{self._session_json(session_data, budget)}"
+            for i, session_data in enumerate(payloads)
+        )
+
+        prompt = f"""
+        Analyze each of the following {len(payloads)} user sessions and provide a comprehensive, detailed description of the user's intent and its fulfillment for each one.
+
+        Focus on:
+        1. **Multi-step processes**: Describe the full journey including initial attempts, failures, debugging steps, and iterative refinements
+        2. **Nuanced success assessment**: Distinguish between partial success, complete success, and specific failure points
+        3. **Elements integration**: Mention all data sources, transformations, and destinations involved
+        4. **Iterative workflows**: Recognize trial-and-error processes, configuration adjustments, and troubleshooting patterns
+
+        {sessions_block}
+
+        For each session, write a single comprehensive paragraph (or multiple paragraphs if the session is complex) that thoroughly describes the user's intent and its fulfillment - what the user was trying to achieve, the technical challenges encountered, the iterative process of refinement and debugging, and the overall outcome.
+
+        Return your answer as a JSON array of exactly {len(payloads)} strings, one description per session, in the same order as the sessions above. Return only the JSON array, no additional text.
+        """
+
+        try:
+            response = self.model.generate_content(prompt)
+            text = response.text.strip()
+            # The model may wrap the JSON in a markdown code fence
+            if text.startswith('```'):
+                text = text.split('\n', 1)[1].rsplit('```', 1)[0].strip()
+            parsed = orjson.loads(text)
+        except Exception:
+            return None
+
+        if isinstance(parsed, list) and len(parsed) == len(payloads) and all(isinstance(d, str) for d in parsed):
+            return [d.strip() for d in parsed]
+        return None
 
     def get_completion(self, prompt: str) -> str:
         """
-        Get a completion from the LLM for a given prompt.
+        Get a completion from the LLM for a given prompt. Responses are
+        content-addressed by prompt hash, in memory and on disk, so
+        repeated identical prompts skip the model call entirely.
         """
+        key = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+        cached = self._completion_cache.get(key)
+        if cached is None:
+            cached = self._cache_get(key)
+        if cached is not None:
+            self._completion_cache[key] = cached
+            return cached
+
         response = self.model.generate_content(prompt)
-        return response.text.strip()
\ No newline at end of file
+        result = response.text.strip()
+        self._completion_cache[key] = result
+        self._cache_put(key, result)
+        return result
\ No newline at end of file
@@ -9,7 +9,7 @@ class ErrorCategory(str, Enum):
     STRANGE_SEQUENCE = "strange_sequence"
     OTHER = "other"
 
-@dataclass
+@dataclass(slots=True)
 class ConfigurationChange:
     configuration_id: str
     component_id: str
@@ -19,7 +19,7 @@ class ConfigurationChange:
     is_deleted: bool
     event_time: datetime
 
-@dataclass
+@dataclass(slots=True)
 class ConfigurationRowChange:
     configuration_row_id: str
     configuration_id: str
@@ -30,7 +30,7 @@ class ConfigurationRowChange:
     is_deleted: bool
     event_time: datetime
 
-@dataclass
+@dataclass(slots=True)
 class JobExecution:
     job_id: str
     configuration_id: str
@@ -39,7 +39,7 @@ class JobExecution:
     status: str
     error_message: Optional[str]
 
-@dataclass
+@dataclass(slots=True)
 class TableEvent:
     event_id: str
     event_type: str
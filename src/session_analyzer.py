@@ -1,9 +1,17 @@
-import json
 import csv
+import heapq
+import orjson
+import re
+import sys
 import uuid
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
+from functools import lru_cache
+from operator import itemgetter
+import numpy as np
+from typing import Iterator, List, Dict, Any, Tuple, Union
 import os
 from .models import (
     Session, ConfigurationChange, ConfigurationRowChange,
@@ -17,6 +25,175 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts the 'Z' suffix directly on 3.11+, so the
+    # normalization branch can be skipped entirely
+    def _parse_ts(s: str) -> datetime:
+        """Parse a Snowflake ISO timestamp."""
+        return datetime.fromisoformat(s)
+else:
+    def _parse_ts(s: str) -> datetime:
+        """Parse a Snowflake ISO timestamp, normalizing a trailing 'Z' suffix."""
+        if s.endswith('Z'):
+            return datetime.fromisoformat(s[:-1] + '+00:00')
+        return datetime.fromisoformat(s)
+
+
+# The per-session JSON sidecar files are written compact by default;
+# set INTENT_DEBUG_JSON=1 to get indented output for manual inspection
+# (indent-heavy pretty printing costs ~30% extra bytes on disk)
+_DEBUG_JSON = os.environ.get('INTENT_DEBUG_JSON') == '1'
+_JSON_OPTS = orjson.OPT_INDENT_2 if _DEBUG_JSON else 0
+
+
+def _write_json(path: str, obj: Any) -> None:
+    """Write a JSON sidecar file in a single syscall."""
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(obj, option=_JSON_OPTS))
+
+
+# Event kind names indexed by the integer tags used through the ingest
+# pipeline; the tag doubles as an index into the constructor dispatch
+# tuple in _create_session
+_EVENT_KINDS = ('config', 'config_row', 'job', 'table')
+
+# Parsers for the line-format categorization response
+_CAT_RE = re.compile(r'^(PRIMARY_GOAL|DEVELOPMENT_STAGE|INTENT_TAGS):\s*(.*)$', re.MULTILINE)
+_SUMMARY_RE = re.compile(r'^SUMMARY:\s*(.*)', re.MULTILINE | re.DOTALL)
+
+# Static prompt scaffolds, built once at import instead of being
+# re-interpolated as kilobyte f-strings per session; only the dynamic
+# fields are formatted in per call
+_CLASSIFY_SESSION_PROMPT = """
+        Analyze this user session and answer four questions about it.
+
+        1. FULFILLMENT (choose exactly one):
+        - "Successful Completion" - Intent fully achieved, all major components worked as expected
+        - "Partial Success" - Some components worked, others failed, mixed results
+        - "Failed with Troubleshooting" - Active problem-solving attempts, debugging activities
+
+        2. PRIMARY GOAL (choose exactly one):
+        - "Ad-hoc analysis/Data exploration/inspection"
+        - "ETL/ELT pipeline setup/Data export/sharing"
+        - "Troubleshooting/Debugging"
+
+        3. DEVELOPMENT STAGE (choose exactly one):
+        - "Creating new use cases"
+        - "Updating existing use cases"
+        - "Testing/validating configurations"
+
+        4. INTENT TAGS (list 2-4 meaningful tags that describe the intent):
+        Generate descriptive tags that capture the essence of what the user was trying to accomplish.
+        Use short, descriptive phrases that would be useful for categorizing and searching intents.
+        Examples: "data-extraction", "pipeline-setup", "troubleshooting", "configuration-update", "data-validation"
+
+        5. SUMMARY: a concise 1-3 sentence summary describing what the user wanted to accomplish,
+        written from the user's perspective using first person ("I want to...", "I need to...").
+        Focus on the user's goals and intentions, not the technical implementation details or outcomes.
+
+        Session details:
+        - Intent description: {intent_description}
+        - Session successful: {is_successful}
+        - Configuration changes: {config_summary}
+        - Job executions: {job_executions}
+        - Table operations: {table_operations}
+        - Job statuses in session: {job_statuses}
+
+        Interacting with the Keboola.sandbox component suggests ad-hoc analysis/Data exploration/inspection, but may
+        also be used for Troubleshooting/Debugging.
+
+        Return your answer as a single JSON object with exactly these keys and no additional text:
+        {{"fulfillment": "...", "primary_goal": "...", "development_stage": "...", "intent_tags": ["...", "..."], "summary": "..."}}
+        """
+
+_FULFILLMENT_PROMPT = """
+        Analyze this user session and classify the outcome into exactly one of these categories:
+
+        1. "Successful Completion" - Intent fully achieved, all major components worked as expected
+        2. "Partial Success" - Some components worked, others failed, mixed results
+        3. "Failed with Troubleshooting" - Active problem-solving attempts, debugging activities
+
+        Session details:
+        - Session successful: {is_successful}
+        - Intent description: {intent_description}
+        - Job executions: {job_executions}
+        - Configuration changes: {configuration_changes}
+        - Table operations: {table_operations}
+
+        Job statuses in session:
+        {job_statuses}
+
+        Return only one of the three exact category names: "Successful Completion", "Partial Success", or "Failed with Troubleshooting"
+        """
+
+_CATEGORIZATION_PROMPT = """
+        Analyze this user session and provide:
+
+        1. PRIMARY GOAL (choose exactly one):
+        - "Ad-hoc analysis/Data exploration/inspection"
+        - "ETL/ELT pipeline setup/Data export/sharing"
+        - "Troubleshooting/Debugging"
+
+        2. DEVELOPMENT STAGE (choose exactly one):
+        - "Creating new use cases"
+        - "Updating existing use cases"
+        - "Testing/validating configurations"
+
+        3. INTENT TAGS (list 2-4 meaningful tags that describe the intent):
+        Generate descriptive tags that capture the essence of what the user was trying to accomplish.
+        Use short, descriptive phrases that would be useful for categorizing and searching intents.
+
+        4. SUMMARY: a concise summary (1-3 sentences) describing what the user wanted to accomplish in this session.
+        Write from the user's perspective using first person ("I want to...", "I need to...", "I am trying to...").
+        Focus on describing the user's goals and intentions, not the technical implementation details or outcomes.
+
+        Session details:
+        - Intent description: {intent_description}
+        - Configuration changes: {config_summary}
+        - Job executions: {job_executions}
+        - Table operations: {table_operations}
+        - Session successful: {is_successful}
+
+        Configuration states:
+        - Created configurations: {created_count}
+        - Modified configurations: {modified_count}
+
+        Interacting with the Keboola.sandbox component suggests ad-hoc analysis/Data exploration/inspection, but may
+        also be used for Troubleshooting/Debugging.
+
+        Examples of good intent tags:
+        - "data-extraction", "datbase-source", "api-source"
+        - "pipeline-setup", "automation", "etl"
+        - "troubleshooting", "connection-error", "mongodb"
+        - "data-transformation", "filtering", "date-range"
+        - "configuration-update", "parameter-change"
+        - "data-validation", "testing", "quality-check"
+
+        Examples of good summaries:
+        - "I want to extract data from my MySQL database and load it into Snowflake for analysis."
+        - "I am trying to troubleshoot my data pipeline because it keeps failing during the extraction step."
+
+        Return your answer in this exact format:
+        PRIMARY_GOAL: [exact category name]
+        DEVELOPMENT_STAGE: [exact category name]
+        INTENT_TAGS: [tag1], [tag2], [tag3], [tag4]
+        SUMMARY: [1-3 sentence summary from the user's perspective]
+        """
+
+
+
+@lru_cache(maxsize=None)
+def _component_id_from_config(configuration_id: str) -> str:
+    """
+    Extract the component_id from a configuration ID
+    (format: project_id_component_id_configuration_number). The same
+    configuration typically appears in many change events, so the parse
+    is memoized per ID.
+    """
+    parts = configuration_id.split('_', 3)
+    return parts[2] if len(parts) > 2 else 'unknown'
+
+
 class SessionAnalyzer:
     def __init__(self):
         self.snowflake_client = SnowflakeClient()
@@ -24,125 +201,212 @@ class SessionAnalyzer:
         self.session_break_threshold = timedelta(hours=4)
         self.new_session_threshold = timedelta(hours=24)
         self.output_dir = 'output'
+        # Number of concurrent per-session LLM classification calls; the
+        # useful ceiling is the provider rate limit, not CPU
+        self.llm_workers = int(os.getenv('LLM_WORKERS', '8'))
+        # Session output directories, built (and created) once per session
+        # in _create_session and reused by the later processing stages
+        self._session_dirs: Dict[str, str] = {}
 
     def analyze_user_sessions(self, token_id: str, project_filter: str, start_date: datetime, end_date: datetime) -> Tuple[List[Intent], List[Error]]:
-        # Get all events
-        config_versions = self.snowflake_client.get_configuration_versions(token_id, project_filter, start_date, end_date)
-        config_row_versions = self.snowflake_client.get_configuration_row_versions(token_id, project_filter, start_date, end_date)
-        jobs = self.snowflake_client.get_jobs(token_id, project_filter, start_date, end_date)
+        """Materialized wrapper around iter_results for callers that need lists."""
+        intents = []
+        errors = []
+        for kind, item in self.iter_results(token_id, project_filter, start_date, end_date):
+            if kind == 'intent':
+                intents.append(item)
+            else:
+                errors.append(item)
+        return intents, errors
+
+    def iter_results(self, token_id: str, project_filter: str, start_date: datetime, end_date: datetime,
+                     prefetched: Tuple[List, List, List, List] = None) -> Iterator[Tuple[str, Union[Intent, Error]]]:
+        """
+        Analyze a token's sessions, yielding ('intent', Intent) and
+        ('error', Error) tuples as they are produced so callers can stream
+        them to disk without holding full result lists in memory.
+
+        prefetched, when given, carries this token's four event streams
+        already partitioned out of a project-wide fetch (see
+        SnowflakeClient.get_project_token_events), skipping the per-token
+        queries entirely.
+        """
+        if prefetched is not None:
+            config_versions, config_row_versions, jobs, fetched_table_events = prefetched
+        else:
+            # Get all events; the four queries travel in one
+            # multi-statement round-trip, so the per-window cost is a
+            # single network exchange instead of four
+            config_versions, config_row_versions, jobs, fetched_table_events = \
+                self.snowflake_client.get_window_events(token_id, project_filter, start_date, end_date)
         if len(jobs) == 0:
             logger.info(f"No jobs found in project {project_filter} for token {token_id} between {start_date} and {end_date}")
-            return [], []
-        table_events = self.snowflake_client.get_table_events(token_id, project_filter, start_date, end_date)
-
-        # Filter out storage.tableMetadataSet and storage.workspaceTableCloned events
-        table_events = [event for event in table_events if event['event'] not in ['storage.tableMetadataSet', 'storage.workspaceTableCloned']]
+            return
+
+        # storage.tableMetadataSet and storage.workspaceTableCloned events
+        # are already excluded in the table-events query
+        table_events = fetched_table_events
+
+        # Each query already returns its stream ordered by its timestamp
+        # column (ORDER BY in the SQL), so a four-way heap merge yields the
+        # globally sorted sequence in O(n) without re-sorting anything in
+        # Python. Each timestamp is parsed exactly once here and cached on
+        # the event dict so the _create_* helpers don't re-parse it.
+        def _tagged(tag, ts_field, source):
+            for event in source:
+                event['_parsed_ts'] = _parse_ts(event[ts_field])
+                yield tag, event['_parsed_ts'], event
+
+        merged = heapq.merge(
+            _tagged(0, 'configuration_updated_at', config_versions),
+            _tagged(1, 'configuration_row_updated_at', config_row_versions),
+            _tagged(2, 'job_created_at', jobs),
+            _tagged(3, 'event_created_at', table_events),
+            key=itemgetter(1),
+        )
 
-        # Combine all events and sort by time
-        all_events = []
-        for event in config_versions:
-            all_events.append(('config', datetime.fromisoformat(event['configuration_updated_at'].replace('Z', '+00:00')), event))
-        for event in config_row_versions:
-            all_events.append(('config_row', datetime.fromisoformat(event['configuration_row_updated_at'].replace('Z', '+00:00')), event))
-        for event in jobs:
-            all_events.append(('job', datetime.fromisoformat(event['job_created_at'].replace('Z', '+00:00')), event))
-        for event in table_events:
-            all_events.append(('table', datetime.fromisoformat(event['event_created_at'].replace('Z', '+00:00')), event))
+        # Collect into struct-of-arrays layout: three parallel lists
+        # instead of one list of (tag, time, data) tuples
+        event_types = []
+        event_times = []
+        event_datas = []
+        for tag, event_time, event in merged:
+            event_types.append(tag)
+            event_times.append(event_time)
+            event_datas.append(event)
 
-        all_events.sort(key=lambda x: x[1])
+        times_ns = np.array([round(t.timestamp() * 1e9) for t in event_times], dtype=np.int64)
 
         # Identify sessions
-        sessions = self._identify_sessions(all_events, token_id, None)  # project_id will be extracted from events
-        logger.info(f"DEBUG: Found {len(sessions)} sessions in project {project_filter} for token {token_id}")
+        sessions = self._identify_sessions(event_types, event_times, event_datas, times_ns, token_id, None)  # project_id will be extracted from events
+        logger.debug("Found %d sessions in project %s for token %s", len(sessions), project_filter, token_id)
         
-        # Analyze each session
-        intents = []
-        errors = []
+        # Prepare all sessions first so the LLM description calls can be
+        # batched across sessions instead of one round-trip per session
+        prepared = []
         for session in sessions:
             try:
-                intent = self._analyze_session(session)
-                intents.append(intent)
+                processed_changes, config_summary = self._prepare_session(session)
+                prepared.append((session, processed_changes, config_summary))
             except Exception as e:
-                error = self._create_error(session, str(e))
-                errors.append(error)
-
-        logger.info(f"DEBUG: Found {len(intents)} intents and {len(errors)} errors in session {session.session_id}")
-        return intents, errors
-
-    def _identify_sessions(self, events: List[Tuple[str, datetime, Dict]], token_id: str, project_id: str) -> List[Session]:
-        if not events:
+                yield 'error', self._create_error(session, str(e))
+
+        descriptions = self.llm_client.analyze_sessions_batch(prepared)
+
+        # Finalize sessions concurrently; each finalization is an
+        # independent blocking LLM classification round-trip, so wall time
+        # is one round-trip per batch of workers instead of one per session.
+        # Results are yielded in session order. Sessions whose description
+        # call failed (the batch returns the exception in their slot) become
+        # errors directly instead of being finalized.
+        with ThreadPoolExecutor(max_workers=self.llm_workers) as executor:
+            futures = [
+                None if isinstance(intent_description, Exception)
+                else executor.submit(self._finalize_intent, session, processed_changes, config_summary, intent_description)
+                for (session, processed_changes, config_summary), intent_description in zip(prepared, descriptions)
+            ]
+            for (session, _, _), intent_description, future in zip(prepared, descriptions, futures):
+                if future is None:
+                    yield 'error', self._create_error(session, str(intent_description))
+                    continue
+                try:
+                    yield 'intent', future.result()
+                except Exception as e:
+                    yield 'error', self._create_error(session, str(e))
+
+    def _identify_sessions(self, event_types: List[int], event_times: List[datetime],
+                           event_datas: List[Dict], times_ns: np.ndarray,
+                           token_id: str, project_id: str) -> List[Session]:
+        if not event_types:
             return []
 
-        sessions = []
-        current_session_events = []
-        last_event_time = None
+        # Session boundaries are the gaps above the break threshold, found
+        # in a single vectorized pass over the pre-sorted nanosecond
+        # timestamps instead of per-event Python timedelta comparisons.
+        # Gaps above the 24h new-session threshold cut at exactly the same
+        # places (both branches of the old loop started a new session), so
+        # one threshold suffices.
+        break_ns = round(self.session_break_threshold.total_seconds() * 1e9)
+        boundaries = np.flatnonzero(np.diff(times_ns) > break_ns) + 1
 
-        for event_type, event_time, event_data in events:
-            if last_event_time is None:
-                current_session_events.append((event_type, event_time, event_data))
-            else:
-                time_diff = event_time - last_event_time
-                if time_diff > self.new_session_threshold:
-                    # Create new session
-                    if current_session_events:
-                        session = self._create_session(current_session_events, token_id, project_id)
-                        sessions.append(session)
-                    current_session_events = [(event_type, event_time, event_data)]
-                elif time_diff > self.session_break_threshold:
-                    # Potential session break
-                    if current_session_events:
-                        session = self._create_session(current_session_events, token_id, project_id)
-                        sessions.append(session)
-                    current_session_events = [(event_type, event_time, event_data)]
-                else:
-                    # Continue current session
-                    current_session_events.append((event_type, event_time, event_data))
-            last_event_time = event_time
-
-        # Add the last session
-        if current_session_events:
-            session = self._create_session(current_session_events, token_id, project_id)
-            sessions.append(session)
+        sessions = []
+        start = 0
+        for end in [*boundaries, len(event_types)]:
+            # Materialize (tag, time, data) tuples only for the slice
+            # handed to _create_session
+            events = list(zip(event_types[start:end], event_times[start:end], event_datas[start:end]))
+            sessions.append(self._create_session(events, token_id, project_id))
+            start = end
 
         return sessions
 
-    def _create_session(self, events: List[Tuple[str, datetime, Dict]], token_id: str, project_id: str) -> Session:
+    def _create_session(self, events: List[Tuple[int, datetime, Dict]], token_id: str, project_id: str) -> Session:
         # Generate session UUID
         session_id = str(uuid.uuid4())
         session_dir = os.path.join(self.output_dir, session_id)
         os.makedirs(session_dir, exist_ok=True)
+        self._session_dirs[session_id] = session_dir
 
         # Save raw events to CSV
         csv_path = os.path.join(session_dir, 'raw_events.csv')
-        with open(csv_path, 'w', newline='') as f:
+        with open(csv_path, 'w', newline='', buffering=1 << 20) as f:
             writer = csv.writer(f)
             # Write header
             writer.writerow(['event_type', 'event_time', 'event_data'])
-            # Write events
-            for event_type, event_time, event_data in events:
-                writer.writerow([event_type, event_time.isoformat(), json.dumps(event_data)])
-
-        config_changes = []
-        config_row_changes = []
-        job_executions = []
-        table_events = []
-
-        for event_type, event_time, event_data in events:
-            if event_type == 'config':
-                config_changes.append(self._create_config_change(event_data))
-            elif event_type == 'config_row':
-                config_row_changes.append(self._create_config_row_change(event_data))
-            elif event_type == 'job':
-                job_executions.append(self._create_job_execution(event_data))
-            elif event_type == 'table':
-                table_events.append(self._create_table_event(event_data))
-
-        # Determine if session was successful
-        is_successful = any(
-            job.status == 'success' for job in job_executions
-        ) and not any(
-            job.status == 'error' for job in job_executions
+            # Write events in one writerows call (minus the cached parsed
+            # timestamp, which is an internal field and not JSON-serializable)
+            writer.writerows(
+                (_EVENT_KINDS[tag], event_time.isoformat(),
+                 orjson.dumps({k: v for k, v in event_data.items() if k != '_parsed_ts'}).decode())
+                for tag, event_time, event_data in events
+            )
+
+        # The integer tag indexes straight into the constructor, bucket and
+        # change-entry tuples, replacing the four-way string-compare chain.
+        # The changes.json entries are emitted in the same pass; since
+        # events arrive time-sorted, the list comes out almost sorted and
+        # the final sort below is a near-linear pass (job entries are dated
+        # by start_time, which can precede the created_at ordering key).
+        ctors = (self._create_config_change, self._create_config_row_change,
+                 self._create_job_execution, self._create_table_event)
+        change_entries = (
+            lambda c: {
+                'date': c.event_time.isoformat(),
+                'type': 'configuration',
+                'entity_id': c.configuration_id,
+                'change_description': f"Configuration {c.configuration_id} was {'created' if c.is_created else 'modified' if not c.is_deleted else 'deleted'}"
+            },
+            lambda c: {
+                'date': c.event_time.isoformat(),
+                'type': 'configuration_row',
+                'entity_id': c.configuration_row_id,
+                'change_description': f"Configuration row {c.configuration_row_id} was {'created' if c.is_created else 'modified' if not c.is_deleted else 'deleted'}"
+            },
+            lambda j: {
+                'date': j.start_time.isoformat(),
+                'type': 'job',
+                'entity_id': j.job_id,
+                'change_description': f"Job {j.job_id} was executed with status {j.status}"
+            },
+            lambda e: {
+                'date': e.event_time.isoformat(),
+                'type': 'table_event',
+                'entity_id': e.event_id,
+                'change_description': f"Table event {e.event_id}: {e.event_type} - {e.message or ''}"
+            },
         )
+        buckets = ([], [], [], [])
+        changes = []
+        for tag, _, event_data in events:
+            entity = ctors[tag](event_data)
+            buckets[tag].append(entity)
+            changes.append(change_entries[tag](entity))
+        config_changes, config_row_changes, job_executions, table_events = buckets
+
+        # Determine if session was successful; a single pass over the
+        # distinct statuses replaces the two any() scans
+        statuses = {job.status for job in job_executions}
+        is_successful = 'success' in statuses and 'error' not in statuses
 
         session = Session(
             start_time=events[0][1],
@@ -157,87 +421,50 @@ class SessionAnalyzer:
             session_id=session_id
         )
 
-        # Save changes to JSON
-        changes = []
-        for change in config_changes:
-            changes.append({
-                'date': change.event_time.isoformat(),
-                'type': 'configuration',
-                'entity_id': change.configuration_id,
-                'change_description': f"Configuration {change.configuration_id} was {'created' if change.is_created else 'modified' if not change.is_deleted else 'deleted'}"
-            })
-        
-        for change in config_row_changes:
-            changes.append({
-                'date': change.event_time.isoformat(),
-                'type': 'configuration_row',
-                'entity_id': change.configuration_row_id,
-                'change_description': f"Configuration row {change.configuration_row_id} was {'created' if change.is_created else 'modified' if not change.is_deleted else 'deleted'}"
-            })
-
-        for job in job_executions:
-            changes.append({
-                'date': job.start_time.isoformat(),
-                'type': 'job',
-                'entity_id': job.job_id,
-                'change_description': f"Job {job.job_id} was executed with status {job.status}"
-            })
-
-        for event in table_events:
-            changes.append({
-                'date': event.event_time.isoformat(),
-                'type': 'table_event',
-                'entity_id': event.event_id,
-                'change_description': f"Table event {event.event_id}: {event.event_type} - {event.message or ''}"
-            })
-
-        # Sort changes by date
+        # Sort changes by date; the list is already nearly sorted (see the
+        # single-pass assembly above), so this is close to a linear pass
         changes.sort(key=lambda x: x['date'])
 
         # Save changes to JSON file
-        changes_path = os.path.join(session_dir, 'changes.json')
-        with open(changes_path, 'w') as f:
-            json.dump(changes, f, indent=2)
+        _write_json(os.path.join(session_dir, 'changes.json'), changes)
 
         return session
 
     def _create_config_change(self, event_data: Dict) -> ConfigurationChange:
-        config_json = json.loads(event_data['configuration_json'])
-        # Extract component_id from configuration_id (format: project_id_component_id_configuration_number)
-        config_id_parts = event_data['kbc_component_configuration_id'].split('_')
-        component_id = config_id_parts[2] if len(config_id_parts) > 2 else 'unknown'
+        # The connector may already have parsed the VARIANT column to a
+        # dict; only parse the raw-string case
+        cfg = event_data['configuration_json']
+        config_json = cfg if isinstance(cfg, dict) else orjson.loads(cfg)
         return ConfigurationChange(
             configuration_id=event_data['kbc_component_configuration_id'],
-            component_id=component_id,
+            component_id=_component_id_from_config(event_data['kbc_component_configuration_id']),
             initial_state=config_json,
             final_state=config_json,
             is_created=False,  # Will be updated in _analyze_session
             is_deleted=False,  # Will be updated in _analyze_session
-            event_time=datetime.fromisoformat(event_data['configuration_updated_at'].replace('Z', '+00:00'))
+            event_time=event_data['_parsed_ts']
         )
 
     def _create_config_row_change(self, event_data: Dict) -> ConfigurationRowChange:
-        config_row_json = json.loads(event_data['configuration_row_json'])
-        # Extract component_id from configuration_id (format: project_id_component_id_configuration_number)
-        config_id_parts = event_data['kbc_component_configuration_id'].split('_')
-        component_id = config_id_parts[2] if len(config_id_parts) > 2 else 'unknown'
+        cfg = event_data['configuration_row_json']
+        config_row_json = cfg if isinstance(cfg, dict) else orjson.loads(cfg)
         return ConfigurationRowChange(
             configuration_row_id=event_data['kbc_component_configuration_row_id'],
             configuration_id=event_data['kbc_component_configuration_id'],
-            component_id=component_id,
+            component_id=_component_id_from_config(event_data['kbc_component_configuration_id']),
             initial_state=config_row_json,
             final_state=config_row_json,
             is_created=False,  # Will be updated in _analyze_session
             is_deleted=False,  # Will be updated in _analyze_session
-            event_time=datetime.fromisoformat(event_data['configuration_row_updated_at'].replace('Z', '+00:00'))
+            event_time=event_data['_parsed_ts']
         )
 
     def _create_job_execution(self, event_data: Dict) -> JobExecution:
         return JobExecution(
             job_id=event_data['kbc_job_id'],
             configuration_id=event_data['kbc_component_configuration_id'],
-            start_time=datetime.fromisoformat(event_data['job_start_at'].replace('Z', '+00:00')),
-            end_time=datetime.fromisoformat(event_data['job_created_at'].replace('Z', '+00:00')),
+            start_time=_parse_ts(event_data['job_start_at']),
+            end_time=event_data['_parsed_ts'],
             status=event_data['job_status'],
             error_message=event_data.get('error_message')
         )
@@ -246,12 +473,31 @@ class SessionAnalyzer:
         return TableEvent(
             event_id=event_data['kbc_table_event_id'],
             event_type=event_data['event'],
-            event_time=datetime.fromisoformat(event_data['event_created_at'].replace('Z', '+00:00')),
+            event_time=event_data['_parsed_ts'],
             table_id=event_data['table_id'],
             message=event_data.get('message')
         )
 
-    def _analyze_session(self, session: Session) -> Intent:
+    def _prepare_session(self, session: Session) -> Tuple[Dict, Dict]:
+        """
+        Process a session's raw events into change descriptions and a
+        configuration summary, and save both to the session directory.
+        Returns (processed_changes, config_summary) for the LLM calls.
+        """
+        session_dir = self._session_dirs[session.session_id]
+
+        # The same parameters dict is embedded in both the processed-changes
+        # and config-summary descriptions, so serialize each dict object at
+        # most once per session
+        params_cache: Dict[int, str] = {}
+
+        def _params_str(params: Dict[str, Any]) -> str:
+            key = id(params)
+            value = params_cache.get(key)
+            if value is None:
+                value = orjson.dumps(params).decode()
+                params_cache[key] = value
+            return value
         # Track state changes
         state_changes = {
             'created_configurations': [],
@@ -279,7 +525,12 @@ class SessionAnalyzer:
                 config_states[change.configuration_id]['final'] = change.final_state
                 config_states[change.configuration_id]['is_deleted'] = change.is_deleted
 
-        # Categorize configuration changes
+        # Categorize configuration changes and emit their descriptions in
+        # the same pass; separate description buckets keep the
+        # created/modified/deleted output ordering
+        created_config_descriptions = []
+        modified_config_descriptions = []
+        deleted_config_descriptions = []
         for config_id, state in config_states.items():
             if state['is_created']:
                 state_changes['created_configurations'].append({
@@ -287,12 +538,19 @@ class SessionAnalyzer:
                     'final_state': state['final'],
                     'component_id': state['component_id']
                 })
+                description = f"Created configuration {config_id} of type {state['component_id']}"
+                if 'parameters' in state['final']:
+                    description += f" with parameters: {_params_str(state['final']['parameters'])}"
+                created_config_descriptions.append(description)
             elif state['is_deleted']:
                 state_changes['deleted_configurations'].append({
                     'id': config_id,
                     'initial_state': state['initial'],
                     'component_id': state['component_id']
                 })
+                deleted_config_descriptions.append(
+                    f"Deleted configuration {config_id} of type {state['component_id']}"
+                )
             else:
                 state_changes['modified_configurations'].append({
                     'id': config_id,
@@ -300,6 +558,10 @@ class SessionAnalyzer:
                     'final_state': state['final'],
                     'component_id': state['component_id']
                 })
+                description = f"Modified configuration {config_id} of type {state['component_id']}"
+                if 'parameters' in state['initial'] and 'parameters' in state['final']:
+                    description += f". Changes in parameters: {_params_str(state['final']['parameters'])}"
+                modified_config_descriptions.append(description)
 
         # Process configuration row changes
         row_states = {}  # Track initial and final states for each row
@@ -317,7 +579,11 @@ class SessionAnalyzer:
                 row_states[change.configuration_row_id]['final'] = change.final_state
                 row_states[change.configuration_row_id]['is_deleted'] = change.is_deleted
 
-        # Categorize configuration row changes
+        # Categorize configuration row changes and emit their descriptions
+        # in the same pass
+        created_row_descriptions = []
+        modified_row_descriptions = []
+        deleted_row_descriptions = []
         for row_id, state in row_states.items():
             if state['is_created']:
                 state_changes['created_configuration_rows'].append({
@@ -326,6 +592,10 @@ class SessionAnalyzer:
                     'final_state': state['final'],
                     'component_id': state['component_id']
                 })
+                description = f"Created configuration row {row_id} for configuration {state['config_id']} of type {state['component_id']}"
+                if 'parameters' in state['final']:
+                    description += f" with parameters: {_params_str(state['final']['parameters'])}"
+                created_row_descriptions.append(description)
             elif state['is_deleted']:
                 state_changes['deleted_configuration_rows'].append({
                     'id': row_id,
@@ -333,6 +603,9 @@ class SessionAnalyzer:
                     'initial_state': state['initial'],
                     'component_id': state['component_id']
                 })
+                deleted_row_descriptions.append(
+                    f"Deleted configuration row {row_id} for configuration {state['config_id']} of type {state['component_id']}"
+                )
             else:
                 state_changes['modified_configuration_rows'].append({
                     'id': row_id,
@@ -341,6 +614,10 @@ class SessionAnalyzer:
                     'final_state': state['final'],
                     'component_id': state['component_id']
                 })
+                description = f"Modified configuration row {row_id} for configuration {state['config_id']} of type {state['component_id']}"
+                if 'parameters' in state['initial'] and 'parameters' in state['final']:
+                    description += f". Changes in parameters: {_params_str(state['final']['parameters'])}"
+                modified_row_descriptions.append(description)
 
         # Process table events
         table_operations = {}  # Track operations for each table
@@ -354,14 +631,21 @@ class SessionAnalyzer:
                 'time': event.event_time.isoformat()
             })
 
-        # Add table operations to state changes
+        # Add table operations to state changes and emit their descriptions
+        table_descriptions = []
         for table_id, operations in table_operations.items():
             state_changes['affected_tables'].append({
                 'id': table_id,
                 'operations': operations
             })
+            for operation in operations:
+                description = f"Table {table_id}: {operation['event_type']}"
+                if operation['message']:
+                    description += f" - {operation['message']}"
+                table_descriptions.append(description)
 
-        # Process job executions
+        # Process job executions and emit their descriptions
+        job_descriptions = []
         for job in session.job_executions:
             state_changes['executed_jobs'].append({
                 'id': job.job_id,
@@ -371,82 +655,24 @@ class SessionAnalyzer:
                 'start_time': job.start_time.isoformat(),
                 'end_time': job.end_time.isoformat()
             })
+            description = f"Job {job.job_id} for configuration {job.configuration_id} executed with status {job.status}"
+            if job.error_message:
+                description += f". Error: {job.error_message}"
+            job_descriptions.append(description)
 
         # Save state changes to session directory
-        session_dir = os.path.join(self.output_dir, session.session_id)
-        state_changes_path = os.path.join(session_dir, 'state_changes.json')
-        with open(state_changes_path, 'w') as f:
-            json.dump(state_changes, f, indent=2)
+        _write_json(os.path.join(session_dir, 'state_changes.json'), state_changes)
 
-        # Process state changes into detailed descriptions
+        # Assemble the detailed descriptions gathered above
         processed_changes = {
-            'configuration_changes': [],
-            'configuration_row_changes': [],
-            'table_operations': [],
-            'job_executions': []
+            'configuration_changes': created_config_descriptions + modified_config_descriptions + deleted_config_descriptions,
+            'configuration_row_changes': created_row_descriptions + modified_row_descriptions + deleted_row_descriptions,
+            'table_operations': table_descriptions,
+            'job_executions': job_descriptions
         }
 
-        # Process configuration changes
-        for config in state_changes['created_configurations']:
-            config_data = config['final_state']
-            description = f"Created configuration {config['id']} of type {config['component_id']}"
-            if 'parameters' in config_data:
-                description += f" with parameters: {json.dumps(config_data['parameters'])}"
-            processed_changes['configuration_changes'].append(description)
-
-        for config in state_changes['modified_configurations']:
-            initial = config['initial_state']
-            final = config['final_state']
-            description = f"Modified configuration {config['id']} of type {config['component_id']}"
-            if 'parameters' in initial and 'parameters' in final:
-                description += f". Changes in parameters: {json.dumps(final['parameters'])}"
-            processed_changes['configuration_changes'].append(description)
-
-        for config in state_changes['deleted_configurations']:
-            config_data = config['initial_state']
-            description = f"Deleted configuration {config['id']} of type {config['component_id']}"
-            processed_changes['configuration_changes'].append(description)
-
-        # Process configuration row changes
-        for row in state_changes['created_configuration_rows']:
-            row_data = row['final_state']
-            description = f"Created configuration row {row['id']} for configuration {row['config_id']} of type {row['component_id']}"
-            if 'parameters' in row_data:
-                description += f" with parameters: {json.dumps(row_data['parameters'])}"
-            processed_changes['configuration_row_changes'].append(description)
-
-        for row in state_changes['modified_configuration_rows']:
-            initial = row['initial_state']
-            final = row['final_state']
-            description = f"Modified configuration row {row['id']} for configuration {row['config_id']} of type {row['component_id']}"
-            if 'parameters' in initial and 'parameters' in final:
-                description += f". Changes in parameters: {json.dumps(final['parameters'])}"
-            processed_changes['configuration_row_changes'].append(description)
-
-        for row in state_changes['deleted_configuration_rows']:
-            row_data = row['initial_state']
-            description = f"Deleted configuration row {row['id']} for configuration {row['config_id']} of type {row['component_id']}"
-            processed_changes['configuration_row_changes'].append(description)
-
-        # Process table operations
-        for table in state_changes['affected_tables']:
-            for operation in table['operations']:
-                description = f"Table {table['id']}: {operation['event_type']}"
-                if operation['message']:
-                    description += f" - {operation['message']}"
-                processed_changes['table_operations'].append(description)
-
-        # Process job executions
-        for job in state_changes['executed_jobs']:
-            description = f"Job {job['id']} for configuration {job['config_id']} executed with status {job['status']}"
-            if job['error_message']:
-                description += f". Error: {job['error_message']}"
-            processed_changes['job_executions'].append(description)
-
         # Save processed changes to session directory
-        processed_changes_path = os.path.join(session_dir, 'state_changes_processed.json')
-        with open(processed_changes_path, 'w') as f:
-            json.dump(processed_changes, f, indent=2)
+        _write_json(os.path.join(session_dir, 'state_changes_processed.json'), processed_changes)
 
         # Summarize configuration and configuration row changes using LLM
         config_summary = {
@@ -456,100 +682,81 @@ class SessionAnalyzer:
             'modified_configuration_rows': []
         }
 
-        # Group configurations by component type
-        configs_by_type = {}
-        for config in state_changes['created_configurations']:
-            component_type = config['component_id']
-            if component_type not in configs_by_type:
-                configs_by_type[component_type] = []
-            configs_by_type[component_type].append(config)
+        # Group configurations by component type and rows by parent
+        # configuration, all in one grouping stage instead of rebuilding
+        # a fresh dict per category
+        created_configs_by_type = defaultdict(list)
+        modified_configs_by_type = defaultdict(list)
+        created_rows_by_config = defaultdict(list)
+        modified_rows_by_config = defaultdict(list)
+        for target, items, key in (
+            (created_configs_by_type, state_changes['created_configurations'], 'component_id'),
+            (modified_configs_by_type, state_changes['modified_configurations'], 'component_id'),
+            (created_rows_by_config, state_changes['created_configuration_rows'], 'config_id'),
+            (modified_rows_by_config, state_changes['modified_configuration_rows'], 'config_id'),
+        ):
+            for item in items:
+                target[item[key]].append(item)
 
         # Summarize created configurations by component type
-        for component_type, configs in configs_by_type.items():
+        for component_type, configs in created_configs_by_type.items():
             if len(configs) == 1:
                 config = configs[0]
                 description = f"Created a {component_type} configuration"
                 if 'parameters' in config['final_state']:
-                    description += f" with parameters: {json.dumps(config['final_state']['parameters'])}"
+                    description += f" with parameters: {_params_str(config['final_state']['parameters'])}"
                 config_summary['created_configurations'].append(description)
             else:
                 description = f"Created {len(configs)} {component_type} configurations"
                 config_summary['created_configurations'].append(description)
 
-        # Group modified configurations by component type
-        configs_by_type = {}
-        for config in state_changes['modified_configurations']:
-            component_type = config['component_id']
-            if component_type not in configs_by_type:
-                configs_by_type[component_type] = []
-            configs_by_type[component_type].append(config)
-
         # Summarize modified configurations by component type
-        for component_type, configs in configs_by_type.items():
+        for component_type, configs in modified_configs_by_type.items():
             if len(configs) == 1:
                 config = configs[0]
                 description = f"Modified a {component_type} configuration"
                 if 'parameters' in config['final_state']:
-                    description += f" with updated parameters: {json.dumps(config['final_state']['parameters'])}"
+                    description += f" with updated parameters: {_params_str(config['final_state']['parameters'])}"
                 config_summary['modified_configurations'].append(description)
             else:
                 description = f"Modified {len(configs)} {component_type} configurations"
                 config_summary['modified_configurations'].append(description)
 
-        # Group configuration rows by parent configuration
-        rows_by_config = {}
-        for row in state_changes['created_configuration_rows']:
-            config_id = row['config_id']
-            if config_id not in rows_by_config:
-                rows_by_config[config_id] = []
-            rows_by_config[config_id].append(row)
-
         # Summarize created configuration rows by parent configuration
-        for config_id, rows in rows_by_config.items():
+        for config_id, rows in created_rows_by_config.items():
             if len(rows) == 1:
                 row = rows[0]
                 description = f"Created a configuration row for configuration {config_id}"
                 if 'parameters' in row['final_state']:
-                    description += f" with parameters: {json.dumps(row['final_state']['parameters'])}"
+                    description += f" with parameters: {_params_str(row['final_state']['parameters'])}"
                 config_summary['created_configuration_rows'].append(description)
             else:
                 description = f"Created {len(rows)} configuration rows for configuration {config_id}"
                 config_summary['created_configuration_rows'].append(description)
 
-        # Group modified configuration rows by parent configuration
-        rows_by_config = {}
-        for row in state_changes['modified_configuration_rows']:
-            config_id = row['config_id']
-            if config_id not in rows_by_config:
-                rows_by_config[config_id] = []
-            rows_by_config[config_id].append(row)
-
         # Summarize modified configuration rows by parent configuration
-        for config_id, rows in rows_by_config.items():
+        for config_id, rows in modified_rows_by_config.items():
             if len(rows) == 1:
                 row = rows[0]
                 description = f"Modified a configuration row for configuration {config_id}"
                 if 'parameters' in row['final_state']:
-                    description += f" with updated parameters: {json.dumps(row['final_state']['parameters'])}"
+                    description += f" with updated parameters: {_params_str(row['final_state']['parameters'])}"
                 config_summary['modified_configuration_rows'].append(description)
             else:
                 description = f"Modified {len(rows)} configuration rows for configuration {config_id}"
                 config_summary['modified_configuration_rows'].append(description)
 
         # Save configuration summary to session directory
-        config_summary_path = os.path.join(session_dir, 'config_summary.json')
-        with open(config_summary_path, 'w') as f:
-            json.dump(config_summary, f, indent=2)
+        _write_json(os.path.join(session_dir, 'config_summary.json'), config_summary)
 
-        # Get intent description from LLM using processed changes and configuration summary
-        intent_description = self.llm_client.analyze_session(session, processed_changes, config_summary)
+        return processed_changes, config_summary
 
-        # Classify intent fulfillment and session categories
-        fulfillment = self._classify_intent_fulfillment(session, processed_changes, config_summary, intent_description)
-        tags, classification, development_stage = self._classify_session_categories(session, processed_changes, config_summary, intent_description)
-        
-        # Generate one sentence intent summary
-        summary = self._generate_intent_summary(session, processed_changes, config_summary, intent_description)
+    def _finalize_intent(self, session: Session, processed_changes: Dict, config_summary: Dict, intent_description: str) -> Intent:
+        # Classify fulfillment, categories, tags and the summary in a
+        # single LLM round-trip instead of three
+        fulfillment, tags, classification, development_stage, summary = self._classify_session(
+            session, processed_changes, config_summary, intent_description
+        )
 
         return Intent(
             start_time=session.start_time,
@@ -567,149 +774,129 @@ class SessionAnalyzer:
             summary=summary
         )
 
-    def _classify_intent_fulfillment(self, session: Session, processed_changes: Dict, config_summary: Dict, intent_description: str) -> str:
+    def _classify_session(self, session: Session, processed_changes: Dict, config_summary: Dict, intent_description: str) -> Tuple[str, List[str], str, str, str]:
+        """
+        Classify the session's fulfillment, primary goal, development stage
+        and tags, and generate the one-sentence summary, all in a single
+        LLM call with a structured JSON response. The three separate
+        classification calls below are kept as a fallback for responses
+        that cannot be parsed.
+
+        Returns: (fulfillment, tags, classification, development_stage, summary)
+        """
+        # Trivial sessions (no configuration work and no jobs) only ever
+        # produce generic output; return the canned classification and
+        # skip the LLM round-trip entirely
+        if not session.configuration_changes and not session.configuration_row_changes and not session.job_executions:
+            return "Unknown", [], "Unknown", "Unknown", ""
+
+        job_statuses = [job.status for job in session.job_executions]
+        # Cap the embedded description lists so pathological sessions
+        # cannot blow up prompt size (and token cost)
+        job_execs = processed_changes.get('job_executions', [])[:50]
+        table_ops = processed_changes.get('table_operations', [])[:50]
+        classification_prompt = _CLASSIFY_SESSION_PROMPT.format(
+            intent_description=intent_description,
+            is_successful=session.is_successful,
+            # Embed as real JSON; orjson is much faster than repr-ing the
+            # nested summary dict and gives the model a cleaner structure
+            config_summary=orjson.dumps(config_summary).decode(),
+            job_executions=job_execs,
+            table_operations=table_ops,
+            job_statuses=job_statuses,
+        )
+
+        try:
+            text = self.llm_client.get_completion(classification_prompt)
+            # The model may wrap the JSON in a markdown code fence
+            if text.startswith('```'):
+                text = text.split('\n', 1)[1].rsplit('```', 1)[0].strip()
+            parsed = orjson.loads(text)
+            fulfillment = str(parsed['fulfillment']).strip().strip('"')
+            classification = str(parsed['primary_goal']).strip().strip('"')
+            development_stage = str(parsed['development_stage']).strip().strip('"')
+            tags = [str(tag).strip().strip('"') for tag in parsed['intent_tags'] if str(tag).strip()]
+            summary = str(parsed['summary']).strip().strip('"')
+            return fulfillment, tags, classification, development_stage, summary
+        except Exception:
+            logger.debug("Combined classification response could not be parsed, falling back to separate calls")
+
+        # Fall back to the line-format prompts: one call for fulfillment,
+        # one combined call for categories and the summary. The status
+        # rollup computed above is reused rather than re-derived.
+        fulfillment = self._classify_intent_fulfillment(session, processed_changes, config_summary, intent_description, job_statuses)
+        tags, classification, development_stage, summary = self._classify_session_categories(session, processed_changes, config_summary, intent_description)
+        return fulfillment, tags, classification, development_stage, summary
+
+    def _classify_intent_fulfillment(self, session: Session, processed_changes: Dict, config_summary: Dict,
+                                     intent_description: str, job_statuses: List[str] = None) -> str:
         """
         Classify the intent success into one of three categories:
         - Successful Completion - Intent fully achieved
         - Partial Success - Some components worked, others failed
         - Failed with Troubleshooting - Active problem-solving attempts
         """
-        fulfillment_prompt = f"""
-        Analyze this user session and classify the outcome into exactly one of these categories:
-
-        1. "Successful Completion" - Intent fully achieved, all major components worked as expected
-        2. "Partial Success" - Some components worked, others failed, mixed results
-        3. "Failed with Troubleshooting" - Active problem-solving attempts, debugging activities
-
-        Session details:
-        - Session successful: {session.is_successful}
-        - Intent description: {intent_description}
-        - Job executions: {processed_changes.get('job_executions', [])}
-        - Configuration changes: {processed_changes.get('configuration_changes', [])}
-        - Table operations: {processed_changes.get('table_operations', [])}
-
-        Job statuses in session:
-        {[job.status for job in session.job_executions]}
-
-        Return only one of the three exact category names: "Successful Completion", "Partial Success", or "Failed with Troubleshooting"
-        """
+        if job_statuses is None:
+            job_statuses = [job.status for job in session.job_executions]
+        fulfillment_prompt = _FULFILLMENT_PROMPT.format(
+            is_successful=session.is_successful,
+            intent_description=intent_description,
+            job_executions=processed_changes.get('job_executions', [])[:50],
+            configuration_changes=processed_changes.get('configuration_changes', [])[:50],
+            table_operations=processed_changes.get('table_operations', [])[:50],
+            job_statuses=job_statuses,
+        )
 
         return self.llm_client.get_completion(fulfillment_prompt).strip().strip('"')
 
-    def _classify_session_categories(self, session: Session, processed_changes: Dict, config_summary: Dict, intent_description: str) -> Tuple[List[str], str, str]:
+    def _classify_session_categories(self, session: Session, processed_changes: Dict, config_summary: Dict, intent_description: str) -> Tuple[List[str], str, str, str]:
         """
-        Classify the session into Primary Goal and Development Stage categories, and generate meaningful intent tags:
-        
+        Classify the session into Primary Goal and Development Stage categories, generate meaningful intent tags,
+        and produce the one-sentence user-perspective summary, all in a single completion:
+
         Primary Goal:
         - Ad-hoc analysis/Data exploration/inspection
         - ETL/ELT pipeline setup/Data export/sharing
         - Troubleshooting/Debugging
-        
+
         Development Stage:
         - Creating new use cases
         - Updating existing use cases
         - Testing/validating configurations
-        
-        Returns: (tags, classification, development_stage)
-        """
-        categorization_prompt = f"""
-        Analyze this user session and provide:
-
-        1. PRIMARY GOAL (choose exactly one):
-        - "Ad-hoc analysis/Data exploration/inspection"
-        - "ETL/ELT pipeline setup/Data export/sharing"
-        - "Troubleshooting/Debugging"
-
-        2. DEVELOPMENT STAGE (choose exactly one):
-        - "Creating new use cases"
-        - "Updating existing use cases"
-        - "Testing/validating configurations"
-
-        3. INTENT TAGS (list 2-4 meaningful tags that describe the intent):
-        Generate descriptive tags that capture the essence of what the user was trying to accomplish.
-        Use short, descriptive phrases that would be useful for categorizing and searching intents.
-
-        Session details:
-        - Intent description: {intent_description}
-        - Configuration changes: {config_summary}
-        - Job executions: {processed_changes.get('job_executions', [])}
-        - Table operations: {processed_changes.get('table_operations', [])}
-        - Session successful: {session.is_successful}
-
-        Configuration states:
-        - Created configurations: {len(config_summary.get('created_configurations', []))}
-        - Modified configurations: {len(config_summary.get('modified_configurations', []))}
-
-        Interacting with the Keboola.sandbox component suggests ad-hoc analysis/Data exploration/inspection, but may
-        also be used for Troubleshooting/Debugging.
-
-        Examples of good intent tags:
-        - "data-extraction", "datbase-source", "api-source"
-        - "pipeline-setup", "automation", "etl"
-        - "troubleshooting", "connection-error", "mongodb"
-        - "data-transformation", "filtering", "date-range"
-        - "configuration-update", "parameter-change"
-        - "data-validation", "testing", "quality-check"
 
-        Return your answer in this exact format:
-        PRIMARY_GOAL: [exact category name]
-        DEVELOPMENT_STAGE: [exact category name]
-        INTENT_TAGS: [tag1], [tag2], [tag3], [tag4]
+        Returns: (tags, classification, development_stage, summary)
         """
+        categorization_prompt = _CATEGORIZATION_PROMPT.format(
+            intent_description=intent_description,
+            config_summary=orjson.dumps(config_summary).decode(),
+            job_executions=processed_changes.get('job_executions', [])[:50],
+            table_operations=processed_changes.get('table_operations', [])[:50],
+            is_successful=session.is_successful,
+            created_count=len(config_summary.get('created_configurations', [])),
+            modified_count=len(config_summary.get('modified_configurations', [])),
+        )
 
         response = self.llm_client.get_completion(categorization_prompt).strip()
-        
-        # Parse the response
-        lines = response.split('\n')
-        primary_goal = None
-        development_stage = None
-        tags = []
-        
-        for line in lines:
-            if line.startswith('PRIMARY_GOAL:'):
-                primary_goal = line.split(':', 1)[1].strip().strip('"')
-            elif line.startswith('DEVELOPMENT_STAGE:'):
-                development_stage = line.split(':', 1)[1].strip().strip('"')
-            elif line.startswith('INTENT_TAGS:'):
-                tags_str = line.split(':', 1)[1].strip()
-                # Parse comma-separated tags
-                tags = [tag.strip().strip('"') for tag in tags_str.split(',') if tag.strip()]
-        
-        # Use primary goal as the main classification
-        classification = primary_goal if primary_goal else "Unknown"
-        development_stage = development_stage if development_stage else "Unknown"
-        
-        return tags, classification, development_stage
-
-    def _generate_intent_summary(self, session: Session, processed_changes: Dict, config_summary: Dict, intent_description: str) -> str:
-        """
-        Generate a 1-3 sentence summary of what the user wanted to do, written from their perspective.
-        """
-        summary_prompt = f"""
-        Create a concise summary (1-3 sentences) describing what the user wanted to accomplish in this session. 
-        Write from the user's perspective using first person ("I want to...", "I need to...", "I am trying to...").
-
-        Session details:
-        - Intent description: {intent_description}
-        - Session successful: {session.is_successful}
-        - Configuration changes: {len(session.configuration_changes)} changes
-        - Job executions: {len(session.job_executions)} jobs
-        - Table events: {len(session.table_events)} events
 
-        Job results: {[job.status for job in session.job_executions]}
+        # Parse the labelled lines in one compiled-regex pass instead of a
+        # per-line startswith cascade
+        fields = {match.group(1): match.group(2).strip().strip('"')
+                  for match in _CAT_RE.finditer(response)}
 
-        Focus on describing the user's goals and intentions, not the technical implementation details or outcomes.
+        tags_str = fields.get('INTENT_TAGS', '')
+        # Parse comma-separated tags
+        tags = [tag.strip().strip('"') for tag in tags_str.split(',') if tag.strip()]
 
-        Examples of good summaries:
-        - "I want to extract data from my MySQL database and load it into Snowflake for analysis."
-        - "I need to set up automated data extraction from MongoDB to create regular reports."
-        - "I want to modify my existing data transformations to filter out older records and only include data from 2023 onwards."
-        - "I am trying to troubleshoot my data pipeline because it keeps failing during the extraction step."
+        # The summary is the last labelled field and may span multiple
+        # lines, so it gets its own DOTALL match over the remainder
+        summary_match = _SUMMARY_RE.search(response)
+        summary = ' '.join(summary_match.group(1).split()).strip('"') if summary_match else ''
 
-        Return only the 1-3 sentence summary from the user's perspective, no additional text.
-        """
+        # Use primary goal as the main classification
+        classification = fields.get('PRIMARY_GOAL') or "Unknown"
+        development_stage = fields.get('DEVELOPMENT_STAGE') or "Unknown"
 
-        return self.llm_client.get_completion(summary_prompt).strip().strip('"')
+        return tags, classification, development_stage, summary
 
     def _create_error(self, session: Session, error_message: str) -> Error:
         return Error(
@@ -1,7 +1,7 @@
 import os
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Iterator, List, Dict, Any
 import snowflake.connector
 from dotenv import load_dotenv
 
@@ -11,6 +11,110 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-window event queries; kept at module level so the single-stream
+# getters and the combined multi-statement fetch share the same SQL.
+# Each query projects only the columns the analyzer actually reads, so
+# Snowflake scans (and ships) fewer bytes per window
+_CONFIG_VERSIONS_SQL = """
+SELECT 
+    "kbc_component_configuration_id",
+    "configuration_updated_at",
+    "configuration_version",
+    "configuration_json"
+FROM "kbc_component_configuration_version"
+WHERE "kbc_token_id" = %s
+AND "kbc_project_id" = %s
+AND "configuration_updated_at" >= %s
+AND "configuration_updated_at" <= %s
+ORDER BY "configuration_updated_at"
+"""
+
+_CONFIG_ROW_VERSIONS_SQL = """
+SELECT 
+    "kbc_component_configuration_row_id",
+    "kbc_component_configuration_id",
+    "configuration_row_updated_at",
+    "configuration_row_version",
+    "configuration_row_json"
+FROM "kbc_component_configuration_row_version"
+WHERE "kbc_token_id" = %s
+AND "kbc_project_id" = %s
+AND "configuration_row_updated_at" >= %s
+AND "configuration_row_updated_at" <= %s
+ORDER BY "configuration_row_updated_at"
+"""
+
+_JOBS_SQL = """
+SELECT 
+    "kbc_job_id",
+    "kbc_component_configuration_id",
+    "job_start_at",
+    "job_created_at",
+    "job_status",
+    "error_message"
+FROM "kbc_job"
+WHERE "kbc_token_id" = %s
+AND "kbc_project_id" = %s
+AND "job_created_at" >= %s
+AND "job_created_at" <= %s
+ORDER BY "job_created_at"
+"""
+
+_TABLE_EVENTS_SQL = """
+SELECT 
+    "kbc_table_event_id",
+    "table_id",
+    "event_created_at",
+    "event",
+    "message"
+FROM "kbc_table_event"
+WHERE "kbc_token_id" = %s
+AND "kbc_project_id" = %s
+AND "event_created_at" >= %s
+AND "event_created_at" <= %s
+AND "event" NOT IN ('storage.tableMetadataSet', 'storage.workspaceTableCloned')
+ORDER BY "event_created_at"
+"""
+
+_WINDOW_QUERIES = (_CONFIG_VERSIONS_SQL, _CONFIG_ROW_VERSIONS_SQL, _JOBS_SQL, _TABLE_EVENTS_SQL)
+
+
+def _project_scope(query: str) -> str:
+    """
+    Derive the project-wide variant of a per-token window query: select
+    the token column as well (callers partition rows per token) and drop
+    the per-token predicate.
+    """
+    query = query.replace('SELECT ', 'SELECT \n    "kbc_token_id",', 1)
+    return query.replace('WHERE "kbc_token_id" = %s\nAND ', 'WHERE ', 1)
+
+
+_PROJECT_WINDOW_QUERIES = tuple(_project_scope(query) for query in _WINDOW_QUERIES)
+
+# Discovery queries; module-level constants keep the SQL text
+# byte-identical across calls so Snowflake's result cache can serve
+# repeated scans
+_DISTINCT_PROJECTS_SQL = """
+SELECT DISTINCT "kbc_project_id"
+FROM "kbc_component_configuration_version"
+WHERE "kbc_project_id" LIKE %s
+ORDER BY "kbc_project_id"
+"""
+
+_DISTINCT_TOKENS_SQL = """
+SELECT DISTINCT "kbc_token_id"
+FROM "kbc_component_configuration_version"
+WHERE "kbc_project_id" LIKE %s
+ORDER BY "kbc_token_id"
+"""
+
+_PROJECT_TOKEN_MAP_SQL = """
+SELECT DISTINCT "kbc_project_id", "kbc_token_id"
+FROM "kbc_component_configuration_version"
+WHERE "kbc_project_id" LIKE %s
+ORDER BY "kbc_project_id", "kbc_token_id"
+"""
+
 class SnowflakeClient:
     def __init__(self):
         logger.info("Initializing Snowflake connection...")
@@ -20,126 +124,143 @@ class SnowflakeClient:
             account=os.getenv('SNOWFLAKE_ACCOUNT'),
             warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
             database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA')
+            schema=os.getenv('SNOWFLAKE_SCHEMA'),
+            client_session_keep_alive=True
         )
         logger.info("Snowflake connection established successfully")
+        # Telemetry adds extra round-trips we never look at
+        self.conn.telemetry_enabled = False
+        # Long-lived cursors, reused across queries instead of paying
+        # cursor setup/teardown per call. The client is used from a single
+        # thread (workers each hold their own client), so the cursors are
+        # never contended.
+        self._cursor = self.conn.cursor()
+        self._dict_cursor = self.conn.cursor(snowflake.connector.DictCursor)
+        # Memoized results of the discovery queries; each one is a full
+        # scan over the configuration-version table and is asked for the
+        # same filter repeatedly during a run
+        self._discovery_cache: Dict[tuple, Any] = {}
+
+    @staticmethod
+    def _window_params(token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> tuple:
+        # Bind the datetimes directly; the connector sends them as native
+        # timestamps, so Snowflake skips string parsing and can prune
+        # partitions on the timestamp predicates
+        return (token_id, project_id, start_date, end_date)
 
     def get_configuration_versions(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        query = """
-        SELECT 
-            "kbc_component_configuration_id",
-            "configuration_updated_at",
-            "configuration_version",
-            "configuration_json",
-            "change_description_short"
-        FROM "kbc_component_configuration_version"
-        WHERE "kbc_token_id" = %s
-        AND "kbc_project_id" = %s
-        AND "configuration_updated_at" >= %s
-        AND "configuration_updated_at" <= %s
-        ORDER BY "configuration_updated_at"
-        """
-        #logger.info(f"Executing configuration versions query for token_id={token_id}, project_id={project_id}")
-        return self._execute_query(query, (token_id, project_id, start_date.strftime('%Y-%m-%dT%H:%M:%S%z'), end_date.strftime('%Y-%m-%dT%H:%M:%S%z')))
+        return self._execute_query(_CONFIG_VERSIONS_SQL, self._window_params(token_id, project_id, start_date, end_date))
 
     def get_configuration_row_versions(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        query = """
-        SELECT 
-            "kbc_component_configuration_row_id",
-            "kbc_component_configuration_id",
-            "configuration_row_updated_at",
-            "configuration_row_version",
-            "configuration_row_json",
-            "change_description_short"
-        FROM "kbc_component_configuration_row_version"
-        WHERE "kbc_token_id" = %s
-        AND "kbc_project_id" = %s
-        AND "configuration_row_updated_at" >= %s
-        AND "configuration_row_updated_at" <= %s
-        ORDER BY "configuration_row_updated_at"
-        """
-        #logger.info(f"Executing configuration row versions query for token_id={token_id}, project_id={project_id}")
-        return self._execute_query(query, (token_id, project_id, start_date.strftime('%Y-%m-%dT%H:%M:%S%z'), end_date.strftime('%Y-%m-%dT%H:%M:%S%z')))
+        return self._execute_query(_CONFIG_ROW_VERSIONS_SQL, self._window_params(token_id, project_id, start_date, end_date))
 
     def get_jobs(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        query = """
-        SELECT 
-            "kbc_job_id",
-            "kbc_component_configuration_id",
-            "job_start_at",
-            "job_created_at",
-            "job_status",
-            "error_type",
-            "error_message",
-            "error_message_short"
-        FROM "kbc_job"
-        WHERE "kbc_token_id" = %s
-        AND "kbc_project_id" = %s
-        AND "job_created_at" >= %s
-        AND "job_created_at" <= %s
-        ORDER BY "job_created_at"
-        """
-        #logger.info(f"Executing jobs query for token_id={token_id}, project_id={project_id}")
-        return self._execute_query(query, (token_id, project_id, start_date.strftime('%Y-%m-%dT%H:%M:%S%z'), end_date.strftime('%Y-%m-%dT%H:%M:%S%z')))
+        return self._execute_query(_JOBS_SQL, self._window_params(token_id, project_id, start_date, end_date))
 
     def get_table_events(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        query = """
-        SELECT 
-            "kbc_table_event_id",
-            "table_id",
-            "event_created_at",
-            "event",
-            "event_type",
-            "message",
-            "params"
-        FROM "kbc_table_event"
-        WHERE "kbc_token_id" = %s
-        AND "kbc_project_id" = %s
-        AND "event_created_at" >= %s
-        AND "event_created_at" <= %s
-        ORDER BY "event_created_at"
+        return self._execute_query(_TABLE_EVENTS_SQL, self._window_params(token_id, project_id, start_date, end_date))
+
+    def get_window_events(self, token_id: str, project_id: str, start_date: datetime, end_date: datetime) -> tuple:
         """
-        #logger.info(f"Executing table events query for token_id={token_id}, project_id={project_id}")
-        return self._execute_query(query, (token_id, project_id, start_date.strftime('%Y-%m-%dT%H:%M:%S%z'), end_date.strftime('%Y-%m-%dT%H:%M:%S%z')))
+        Fetch all four event streams for one (token, project, window) in a
+        single multi-statement round-trip, amortizing query compilation and
+        network latency across the statements.
 
-    def get_distinct_project_ids(self, project_id_filter: str) -> List[str]:
-        query = """
-        SELECT DISTINCT "kbc_project_id"
-        FROM "kbc_component_configuration_version"
-        WHERE "kbc_project_id" LIKE %s
-        ORDER BY "kbc_project_id"
+        Returns (config_versions, config_row_versions, jobs, table_events).
+        """
+        window = self._window_params(token_id, project_id, start_date, end_date)
+        cursor = self._dict_cursor
+        try:
+            cursor.execute(';'.join(_WINDOW_QUERIES), window * len(_WINDOW_QUERIES),
+                           num_statements=len(_WINDOW_QUERIES))
+            results = [cursor.fetchall()]
+            while cursor.nextset():
+                results.append(cursor.fetchall())
+            return tuple(results)
+        except Exception as e:
+            logger.error(f"Error executing window events query: {str(e)}")
+            raise
+
+    def get_project_token_events(self, project_id: str, start_date: datetime, end_date: datetime) -> Dict[str, tuple]:
         """
-        #logger.info(f"Executing distinct project IDs query with filter={project_id_filter}")
-        results = self._execute_query(query, (f'%{project_id_filter}',))
-        return [row['kbc_project_id'] for row in results]
+        Fetch all four event streams for every token in a project in a
+        single multi-statement round-trip and partition the rows per
+        token, so a project costs one network exchange instead of one
+        per token.
 
-    def get_distinct_token_ids(self, project_id_filter: str) -> List[str]:
-        query = """
-        SELECT DISTINCT "kbc_token_id"
-        FROM "kbc_component_configuration_version"
-        WHERE "kbc_project_id" LIKE %s
-        ORDER BY "kbc_token_id"
+        Returns {token_id: (config_versions, config_row_versions, jobs, table_events)}.
         """
-        #logger.info(f"Executing distinct token IDs query with project filter={project_id_filter}")
-        results = self._execute_query(query, (f'%{project_id_filter}',))
-        return [row['kbc_token_id'] for row in results]
+        params = (project_id, start_date, end_date)
+        cursor = self._dict_cursor
+        try:
+            cursor.execute(';'.join(_PROJECT_WINDOW_QUERIES), params * len(_PROJECT_WINDOW_QUERIES),
+                           num_statements=len(_PROJECT_WINDOW_QUERIES))
+            streams = [cursor.fetchall()]
+            while cursor.nextset():
+                streams.append(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Error executing project window events query: {str(e)}")
+            raise
 
-    def _execute_query(self, query: str, params: tuple) -> List[Dict[str, Any]]:
+        per_token: Dict[str, tuple] = {}
+        for index, rows in enumerate(streams):
+            for row in rows:
+                per_token.setdefault(row['kbc_token_id'], ([], [], [], []))[index].append(row)
+        return per_token
+
+    def get_distinct_project_ids(self, project_id_filter: str) -> List[str]:
+        key = ('projects', project_id_filter)
+        if key not in self._discovery_cache:
+            results = self._execute_query(_DISTINCT_PROJECTS_SQL, (f'%{project_id_filter}',))
+            self._discovery_cache[key] = [row['kbc_project_id'] for row in results]
+        return self._discovery_cache[key]
+
+    def get_distinct_token_ids(self, project_id_filter: str) -> List[str]:
+        key = ('tokens', project_id_filter)
+        if key not in self._discovery_cache:
+            results = self._execute_query(_DISTINCT_TOKENS_SQL, (f'%{project_id_filter}',))
+            self._discovery_cache[key] = [row['kbc_token_id'] for row in results]
+        return self._discovery_cache[key]
+
+    def get_project_token_map(self, project_id_filter: str) -> Dict[str, List[str]]:
+        """Get all matching project IDs and their token IDs in a single query"""
+        key = ('project_token_map', project_id_filter)
+        if key not in self._discovery_cache:
+            results = self._execute_query(_PROJECT_TOKEN_MAP_SQL, (f'%{project_id_filter}',))
+            mapping: Dict[str, List[str]] = {}
+            for row in results:
+                mapping.setdefault(row['kbc_project_id'], []).append(row['kbc_token_id'])
+            self._discovery_cache[key] = mapping
+        return self._discovery_cache[key]
+
+    def _iter_query(self, query: str, params: tuple) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a query's rows. The shared cursor is reused across calls,
+        so the rows must be fully consumed before the next query runs on
+        this client.
+        """
         #logger.info(f"Executing query: {query}")
         #logger.info(f"With parameters: {params}")
-        cursor = self.conn.cursor(snowflake.connector.DictCursor)
+        cursor = self._cursor
         try:
             cursor.execute(query, params)
-            results = cursor.fetchall()
-            # logger.info(f"Query executed successfully, returned {len(results)} rows")
-            return results
+            # Fetch over the Arrow path: the connector streams columnar
+            # batches instead of building a Python object per cell, and
+            # each batch is converted to dicts and yielded before the next
+            # one is pulled, so peak memory is one batch rather than the
+            # whole result set
+            for batch in cursor.fetch_pandas_batches():
+                yield from batch.to_dict('records')
         except Exception as e:
             logger.error(f"Error executing query: {str(e)}")
             raise
-        finally:
-            cursor.close()
+
+    def _execute_query(self, query: str, params: tuple) -> List[Dict[str, Any]]:
+        return list(self._iter_query(query, params))
 
     def close(self):
         logger.info("Closing Snowflake connection...")
+        self._cursor.close()
+        self._dict_cursor.close()
         self.conn.close()
         logger.info("Snowflake connection closed") 
\ No newline at end of file